@@ -3,6 +3,10 @@
 #  Advent of Code 2019 - day 1
 #
 from pathlib import Path
+from functools import lru_cache
+from collections import Counter
+
+import numpy as np
 
 INPUTFILE = "input.txt"
 
@@ -37,6 +41,56 @@ def fuel_required2(mass):
         fuel = max((fuel // 3) - 2, 0)
     return result
 
+@lru_cache(maxsize=1 << 16)
+def fuel_required_cached(mass):
+    """Return the fuel for a mass, including the fuel for the fuel.  The
+    results are cached, and each one reuses the result for its fuel.
+    """
+    fuel = (int(mass) // 3) - 2
+    if fuel <= 0:
+        return 0
+    return fuel + fuel_required_cached(fuel)
+
+def fuel_array(masses, recursive=False):
+    """Return the total fuel for an array of masses.  If recursive is True,
+    include the fuel needed for the fuel: the formula is applied again to
+    the fuel amounts that are still positive, until none are left.
+    """
+    fuel = np.asarray(masses, dtype=np.int64) // 3 - 2
+    fuel = fuel[fuel > 0]
+    total = int(fuel.sum())
+    while recursive and fuel.size:
+        fuel = fuel // 3 - 2
+        fuel = fuel[fuel > 0]
+        total += int(fuel.sum())
+    return total
+
+def read_masses(infile, chunk_size=1 << 24):
+    """Generate arrays of the masses in a file, reading about chunk_size
+    bytes at a time.
+    """
+    with Path(infile).open("rb") as fh:
+        tail = b""
+        while chunk := fh.read(chunk_size):
+            data, _, tail = (tail + chunk).rpartition(b"\n")
+            if data.strip():
+                yield np.fromstring(data, dtype=np.int64, sep=" ")
+        if tail.strip():
+            yield np.fromstring(tail, dtype=np.int64, sep=" ")
+
+def solve_stream(infile, recursive=False, chunk_size=1 << 24):
+    """Solve the problem, reading the masses from infile in chunks."""
+    return sum([fuel_array(masses, recursive) for masses in read_masses(infile, chunk_size)])
+
+def solve_np(lines, recursive=False):
+    """Solve the problem with NumPy arrays."""
+    return fuel_array([int(line) for line in lines], recursive)
+
+def solve2_counter(lines):
+    """Solve the problem, computing the fuel for each distinct mass once."""
+    counts = Counter([int(line) for line in lines])
+    return sum([fuel_required_cached(mass) * count for mass, count in counts.items()])
+
 def solve(lines):
     """Solve the problem."""
     total_fuel = 0
@@ -70,6 +124,8 @@ def part1(lines):
     result = solve(lines)
     print(f"result is {result}")
     assert result == 3324332
+    assert solve_np(lines) == result
+    assert solve_stream(INPUTFILE) == result
     print("= " * 32)
 
 
@@ -86,6 +142,7 @@ def example2():
     print("EXAMPLE 2:")
     for arg, expected in SAMPLE_CASES2:
         result = fuel_required2(arg)
+        assert fuel_required_cached(arg) == expected
         print(f"'sample-input' -> {result} (expected {expected})")
         assert result == expected
     print("= " * 32)
@@ -94,6 +151,9 @@ def example2():
 def part2(lines):
     print("PART 2:")
     result = solve2(lines)
+    assert solve_np(lines, recursive=True) == result
+    assert solve2_counter(lines) == result
+    assert solve_stream(INPUTFILE, recursive=True, chunk_size=64) == result
     print(f"result is {result}")
     print("= " * 32)
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Dense 2D grid of bits, packed eight cells to a byte
+"""
+from typing import Optional
+
+import numpy as np
+
+
+class BitGrid:
+    """A BitGrid instance stores one bit per cell of an unbounded 2D grid.
+    Each row of the grid is packed into ncols / 8 bytes of a bytearray.
+    Cells are addressed by (row, column) coordinates, which may be
+    negative; origin holds the array indices of cell (0, 0).  The array
+    doubles in size along an axis whenever a cell outside it is set.
+    """
+
+    def __init__(self, shape: tuple[int, int] = (64, 64)):
+        nrows, ncols = shape
+        assert ncols % 16 == 0, "ncols must be a multiple of 16"
+        self.nrows, self.ncols = nrows, ncols
+        self.row_bytes = ncols // 8
+        self.bits = bytearray(nrows * self.row_bytes)
+        self.origin = (nrows // 2, ncols // 2)
+        self._bounds: Optional[tuple[int, int, int, int]] = None
+
+    def get(self, r: int, c: int) -> int:
+        """Return the bit at (r, c)."""
+        i, j = r + self.origin[0], c + self.origin[1]
+        if 0 <= i < self.nrows and 0 <= j < self.ncols:
+            return (self.bits[i * self.row_bytes + (j >> 3)] >> (j & 7)) & 1
+        return 0
+
+    def set(self, r: int, c: int, value: int) -> None:
+        """Set the bit at (r, c), growing the grid if needed."""
+        i, j = r + self.origin[0], c + self.origin[1]
+        if not (0 <= i < self.nrows and 0 <= j < self.ncols):
+            self.grow(r, c)
+            i, j = r + self.origin[0], c + self.origin[1]
+        idx = i * self.row_bytes + (j >> 3)
+        if value:
+            self.bits[idx] |= 1 << (j & 7)
+        else:
+            self.bits[idx] &= ~(1 << (j & 7)) & 0xff
+
+        if self._bounds is None:
+            self._bounds = (r, r, c, c)
+        else:
+            rmin, rmax, cmin, cmax = self._bounds
+            if not (rmin <= r <= rmax and cmin <= c <= cmax):
+                self._bounds = (min(rmin, r), max(rmax, r), min(cmin, c), max(cmax, c))
+
+    def grow(self, r: int, c: int) -> None:
+        """Reallocate the bytearray so that it includes cell (r, c).  Each
+        axis that is too small is doubled (repeatedly, if necessary), with
+        the new space split evenly before and after the existing cells.
+        """
+        nrows, ncols = self.nrows, self.ncols
+        i0, j0 = self.origin
+        while not (0 <= r + i0 < nrows):
+            i0 += nrows // 2
+            nrows *= 2
+        while not (0 <= c + j0 < ncols):
+            j0 += ncols // 2
+            ncols *= 2
+        row_bytes = ncols // 8
+        bits = bytearray(nrows * row_bytes)
+        di, dj = i0 - self.origin[0], (j0 - self.origin[1]) // 8
+        for i in range(self.nrows):
+            start = (i + di) * row_bytes + dj
+            bits[start:start + self.row_bytes] = self.bits[
+                i * self.row_bytes:(i + 1) * self.row_bytes
+            ]
+        self.nrows, self.ncols, self.row_bytes = nrows, ncols, row_bytes
+        self.bits = bits
+        self.origin = (i0, j0)
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """Return (rmin, rmax, cmin, cmax) for the cells that have been set."""
+        if self._bounds is None:
+            return 0, 0, 0, 0
+        return self._bounds
+
+    def count(self) -> int:
+        """Return the number of bits that are set."""
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def to_array(self) -> np.ndarray:
+        """Return the bits within the bounds as a 2D uint8 array of 0/1."""
+        rmin, rmax, cmin, cmax = self.bounds()
+        i0, j0 = self.origin
+        rows = np.frombuffer(self.bits, dtype=np.uint8).reshape(self.nrows, self.row_bytes)
+        cells = np.unpackbits(rows[rmin + i0:rmax + i0 + 1], axis=1, bitorder="little")
+        return cells[:, cmin + j0:cmax + j0 + 1]
@@ -4,9 +4,15 @@
 #
 from typing import Sequence, Optional, Any
 from pathlib import Path
-from dataclasses import dataclass
-from collections import defaultdict
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
 from intcode import IntCode
+from grid import Grid
+from bitgrid import BitGrid
 
 INPUTFILE = "input.txt"
 
@@ -34,61 +40,67 @@ UP, RIGHT, DOWN, LEFT = 0, 1, 2, 3
 BLACK, WHITE = 0, 1
 COLOR = {BLACK: ".", WHITE: "#"}
 
-@dataclass(frozen=True)
+# (row, column) offset of a step in each direction, indexed by direction
+STEP = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
 class Location:
     """A Location instance represents a location on a grid.
-    Internally, it's reprsented using (row, column) coordinates
+    Internally, it's reprsented using (row, column) coordinates.
+    Instances are slotted and hashed as a packed integer, since the robot
+    creates one on every step; treat them as immutable.
     """
-    r: int
-    c: int
+    __slots__ = ("r", "c")
+
+    def __init__(self, r: int, c: int):
+        self.r = r
+        self.c = c
+
+    def __repr__(self) -> str:
+        return f"Location(r={self.r}, c={self.c})"
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not Location:
+            return NotImplemented
+        return self.r == other.r and self.c == other.c
+
+    def __hash__(self) -> int:
+        return (self.r << 32) ^ self.c
 
     def move(self, direction: int):
-        if direction == UP:
-            return Location(self.r - 1, self.c)
-        if direction == DOWN:
-            return Location(self.r + 1, self.c)
-        if direction == RIGHT:
-            return Location(self.r, self.c + 1)
-        if direction == LEFT:
-            return Location(self.r, self.c - 1)
-        raise ValueError(f"unsupported direction '{direction}'")
+        if not 0 <= direction < len(STEP):
+            raise ValueError(f"unsupported direction '{direction}'")
+        dr, dc = STEP[direction]
+        return Location(self.r + dr, self.c + dc)
 
 
 class Hull:
     def __init__(self):
-        self.colors = defaultdict(int)
-        self.painted = set()
+        self.colors = Grid(BLACK)
+        self.painted = Grid(0)
 
     def color(self, loc: Location, new_color: Optional[int] = None) -> int:
         """Get (or set) the color at the specified location."""
         if new_color is not None:
-            self.colors[loc] = new_color
-            self.painted.add(loc)
-        return self.colors[loc]
+            self.colors.set(loc.r, loc.c, new_color)
+            self.painted.set(loc.r, loc.c, 1)
+            return new_color
+        return self.colors.get(loc.r, loc.c)
 
     def panels_painted(self) -> int:
-        return len(self.painted)
+        return self.painted.count(1)
 
     def bounds(self) -> tuple[int, int, int, int]:
-        if not self.colors:
-            return 0, 0, 0, 0
-        rmin = min([loc.r for loc in self.colors.keys()])
-        rmax = max([loc.r for loc in self.colors.keys()])
-        cmin = min([loc.c for loc in self.colors.keys()])
-        cmax = max([loc.c for loc in self.colors.keys()])
-        return rmin, rmax, cmin, cmax
+        return self.colors.bounds()
 
     def dimensions(self) -> tuple[int, int]:
         rmin, rmax, cmin, cmax = self.bounds()
         return rmax - rmin + 1, cmax - cmin + 1
 
+    def to_array(self) -> np.ndarray:
+        return self.colors.view().astype(np.uint8)
+
     def print(self):
-        rmin, rmax, cmin, cmax = self.bounds()
-        for r in range(rmin, rmax+1):
-            row = []
-            for c in range(cmin, cmax+1):
-                row.append(COLOR[self.colors[Location(r, c)]])
-            print("".join(row))
+        print(render_text(self.to_array()))
 
 
 class Robot:
@@ -118,6 +130,142 @@ class Robot:
     def panels_painted(self) -> int:
         return self.hull.panels_painted()
 
+class FastRobot:
+    """A FastRobot paints the hull by running the intcode program in its
+    own interpreter loop, with the robot's camera and motors wired
+    directly to the input and output instructions.  There is no input or
+    output queue, and no return from the processor between paint steps.
+    The panel colors, and which panels were painted, are kept in bit
+    grids, so even millions of panels take little memory.
+    """
+
+    def __init__(self, program: str):
+        self.mem: list[int] = [int(v.strip()) for v in program.split(",")]
+        self.colors = BitGrid()
+        self.painted = BitGrid()
+        self.loc: Location = Location(0, 0)
+        self.direction = UP
+
+    def run(self) -> None:
+        mem = self.mem
+        colors, painted = self.colors, self.painted
+        r, c, direction = self.loc.r, self.loc.c, self.direction
+        ip, base = 0, 0
+        paint_next = True # the next output is a color, not a turn
+
+        def addr(i: int, mode: int) -> int:
+            """Return the memory address of the parameter at mem[i]."""
+            if mode == 0:
+                a = mem[i]
+            elif mode == 1:
+                a = i
+            else:
+                a = base + mem[i]
+            if a >= len(mem):
+                mem.extend([0] * (a + 1 - len(mem)))
+            return a
+
+        while True:
+            ins = mem[ip]
+            op = ins % 100
+            m1, m2, m3 = ins // 100 % 10, ins // 1000 % 10, ins // 10000 % 10
+            if op == 1:
+                mem[addr(ip + 3, m3)] = mem[addr(ip + 1, m1)] + mem[addr(ip + 2, m2)]
+                ip += 4
+            elif op == 2:
+                mem[addr(ip + 3, m3)] = mem[addr(ip + 1, m1)] * mem[addr(ip + 2, m2)]
+                ip += 4
+            elif op == 3:
+                # camera: the color of the panel we're on
+                mem[addr(ip + 1, m1)] = colors.get(r, c)
+                ip += 2
+            elif op == 4:
+                value = mem[addr(ip + 1, m1)]
+                ip += 2
+                if paint_next:
+                    colors.set(r, c, value)
+                    painted.set(r, c, 1)
+                else:
+                    direction = (direction + (2 * value - 1)) % 4
+                    dr, dc = STEP[direction]
+                    r, c = r + dr, c + dc
+                paint_next = not paint_next
+            elif op == 5:
+                if mem[addr(ip + 1, m1)]:
+                    ip = mem[addr(ip + 2, m2)]
+                else:
+                    ip += 3
+            elif op == 6:
+                if not mem[addr(ip + 1, m1)]:
+                    ip = mem[addr(ip + 2, m2)]
+                else:
+                    ip += 3
+            elif op == 7:
+                mem[addr(ip + 3, m3)] = int(mem[addr(ip + 1, m1)] < mem[addr(ip + 2, m2)])
+                ip += 4
+            elif op == 8:
+                mem[addr(ip + 3, m3)] = int(mem[addr(ip + 1, m1)] == mem[addr(ip + 2, m2)])
+                ip += 4
+            elif op == 9:
+                base += mem[addr(ip + 1, m1)]
+                ip += 2
+            elif op == 99:
+                break
+            else:
+                raise RuntimeError(f"unrecognized op '{op}'")
+
+        self.loc, self.direction = Location(r, c), direction
+
+    def panels_painted(self) -> int:
+        return self.painted.count()
+
+    def to_array(self) -> np.ndarray:
+        return self.colors.to_array()
+
+    def print(self):
+        print(render_text(self.to_array()))
+
+
+def render_text(panels: np.ndarray) -> str:
+    """Return the panel colors (a 2D array of BLACK/WHITE values) as
+    lines of text, built with array operations rather than per panel.
+    """
+    codes = np.array([ord(COLOR[BLACK]), ord(COLOR[WHITE])], dtype=np.uint8)
+    text = np.empty((panels.shape[0], panels.shape[1] + 1), dtype=np.uint8)
+    text[:, :-1] = codes[panels]
+    text[:, -1] = ord("\n")
+    return text.tobytes().decode("ascii").rstrip("\n")
+
+def write_pbm(panels: np.ndarray, path: str) -> None:
+    """Write the panel colors as a binary PBM bitmap, with one pixel per
+    panel.  As in write_png(), white panels are white (a 0 bit in PBM).
+    """
+    nrows, ncols = panels.shape
+    header = f"P4\n{ncols} {nrows}\n".encode("ascii")
+    Path(path).write_bytes(header + np.packbits(panels == BLACK, axis=1).tobytes())
+
+def write_png(panels: np.ndarray, path: str, scale: int = 1) -> None:
+    """Write the panel colors as a grayscale PNG image, with each panel
+    drawn as a scale x scale block of pixels.  White panels are white.
+    """
+    pixels = np.where(panels == WHITE, 255, 0).astype(np.uint8)
+    pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    nrows, ncols = pixels.shape
+    # each scanline is preceded by a filter type byte (0 = none)
+    raw = np.hstack([np.zeros((nrows, 1), dtype=np.uint8), pixels]).tobytes()
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    Path(path).write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", ncols, nrows, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
 class MockIntCode:
     def __init__(self, inp: list[int], out: list[Any]):
         self.inp = inp
@@ -153,18 +301,17 @@ def test_robot() -> int:
 
 def solve(lines: Lines) -> int:
     """Solve the problem."""
-    proc = IntCode(lines[0])
-    robot = Robot(proc)
+    robot = FastRobot(lines[0])
     robot.run()
     return robot.panels_painted()
 
-def solve2(lines: Lines) -> int:
-    """Solve the problem."""
-    proc = IntCode(lines[0])
-    robot = Robot(proc)
-    robot.hull.color(robot.loc, WHITE)
+def solve2(lines: Lines) -> np.ndarray:
+    """Solve the problem, and return the panel colors."""
+    robot = FastRobot(lines[0])
+    robot.colors.set(robot.loc.r, robot.loc.c, WHITE)
     robot.run()
-    robot.hull.print()
+    robot.print()
+    return robot.to_array()
 
 
 # PART 1
@@ -192,7 +339,28 @@ def part1(lines: Lines) -> None:
 def part2(lines: Lines) -> None:
     print("PART 2:")
     lines = load_input(INPUTFILE)
-    result = solve2(lines)
+    panels = solve2(lines)
+    nrows, ncols = panels.shape
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pbm = Path(tmpdir) / "hull.pbm"
+        write_pbm(panels, str(pbm))
+        header = f"P4\n{ncols} {nrows}\n".encode("ascii")
+        data = pbm.read_bytes()
+        assert data.startswith(header)
+        assert len(data) == len(header) + nrows * ((ncols + 7) // 8)
+        bits = np.frombuffer(data[len(header):], dtype=np.uint8).reshape(nrows, -1)
+        assert np.array_equal(np.unpackbits(bits, axis=1)[:, :ncols] == 0, panels == WHITE)
+
+        png, scale = Path(tmpdir) / "hull.png", 4
+        write_png(panels, str(png), scale)
+        data = png.read_bytes()
+        assert data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR"
+        assert struct.unpack(">II", data[16:24]) == (ncols * scale, nrows * scale)
+        idat_len = struct.unpack(">I", data[33:37])[0]
+        raw = zlib.decompress(data[41:41 + idat_len])
+        assert len(raw) == nrows * scale * (ncols * scale + 1)
+        pixels = np.frombuffer(raw, dtype=np.uint8).reshape(nrows * scale, -1)[:, 1:]
+        assert np.array_equal(pixels[::scale, ::scale] == 255, panels == WHITE)
     print("= " * 32)
 
 
@@ -5,9 +5,12 @@
 from typing import Sequence, Optional
 from pathlib import Path
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 import math
 import re
 
+import numpy as np
+
 INPUTFILE = "input.txt"
 
 SAMPLE_CASES = [
@@ -98,16 +101,50 @@ class Vector:
         )
 
 
+class History:
+    """A History holds the most recent phase states of a body, up to a
+    fixed capacity, in a preallocated ring buffer.  Once it is full, each
+    new state overwrites the oldest one.
+    """
+    def __init__(self, capacity: int):
+        self.states = np.zeros((capacity, 6), dtype=np.int64)
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        return min(self.count, len(self.states))
+
+    def append(self, state: tuple[int, ...]) -> None:
+        self.states[self.count % len(self.states)] = state
+        self.count += 1
+
+    def to_array(self) -> np.ndarray:
+        """Return the stored states, oldest first, as an (n, 6) array."""
+        start = self.count % len(self.states)
+        if self.count <= len(self.states):
+            return self.states[:self.count].copy()
+        return np.concatenate((self.states[start:], self.states[:start]))
+
+
 class Body:
     """A Body represents the position and velocity of a single orbital body.
+    If history_size is given, the last history_size phase states of the
+    body are kept in its history; otherwise none are recorded.
     """
-    def __init__(self, position: Vector, velocity: Optional[Vector] = None):
+    def __init__(
+        self,
+        position: Vector,
+        velocity: Optional[Vector] = None,
+        history_size: int = 0,
+    ):
         self.r = position
         if velocity is None:
             self.v = Vector(0, 0, 0)
         else:
             self.v = velocity
-        self.history = [self.phase_state()]
+        self.history: Optional[History] = None
+        if history_size:
+            self.history = History(history_size)
+            self.history.append(self.phase_state())
 
     def __str__(self):
         return f"pos={str(self.r)}, vel={str(self.v)}"
@@ -118,7 +155,8 @@ class Body:
     def step(self, force: Vector):
         self.v += force
         self.r += self.v
-        self.history.append([self.phase_state()])
+        if self.history is not None:
+            self.history.append(self.phase_state())
 
     def compare(self, other: "Body") -> Vector:
         return self.r.compare(other.r)
@@ -202,6 +240,84 @@ class OrbitalSystem:
         print(f"{time}: {state['xr']}, {state['xv']} : {state['yr']}, {state['yv']} : {state['zr']}, {state['zv']}")
 
 
+class ArraySystem:
+    """An ArraySystem simulates the same orbital system as OrbitalSystem,
+    but keeps the positions and velocities of all the bodies in two
+    (n_bodies, 3) int arrays, which are updated in place.  Gravity on
+    each body is the sum of sign(r_other - r) over the other bodies,
+    computed for every pair at once by broadcasting.
+    """
+    def __init__(self, positions: np.ndarray, velocities: Optional[np.ndarray] = None):
+        self.r = np.array(positions, dtype=np.int64)
+        if velocities is None:
+            self.v = np.zeros_like(self.r)
+        else:
+            self.v = np.array(velocities, dtype=np.int64)
+        self.time: int = 0
+
+    @classmethod
+    def from_bodies(cls, bodies: list[Body]) -> "ArraySystem":
+        states = np.array([body.phase_state() for body in bodies], dtype=np.int64)
+        return cls(states[:, :3], states[:, 3:])
+
+    def step(self) -> None:
+        r, v = self.r, self.v
+        v -= np.sign(r[:, None] - r[None, :]).sum(axis=1)
+        r += v
+        self.time += 1
+
+    def run(self, steps: int) -> None:
+        for _ in range(steps):
+            self.step()
+
+    def total_energy(self) -> int:
+        return int((np.abs(self.r).sum(axis=1) * np.abs(self.v).sum(axis=1)).sum())
+
+    def find_cycle(self) -> int:
+        """Step until each axis returns to its starting state, and return
+        the lcm of the three periods.
+        """
+        r0, v0 = self.r.copy(), self.v.copy()
+        start = self.time
+        periods: list[Optional[int]] = [None, None, None]
+        while None in periods:
+            self.step()
+            for axis in range(3):
+                if periods[axis] is None and (
+                    np.array_equal(self.r[:, axis], r0[:, axis]) and
+                    np.array_equal(self.v[:, axis], v0[:, axis])
+                ):
+                    periods[axis] = self.time - start
+        return lcm(*periods)
+
+
+def axis_period(positions: Sequence[int]) -> int:
+    """Simulate one axis of the system as a 1D system of bodies starting
+    at rest at the given positions.  Return the number of steps until it
+    returns to its initial state.
+    """
+    init = list(positions)
+    r = list(positions)
+    v = [0] * len(r)
+    n = len(r)
+    time = 0
+    while True:
+        for i in range(n):
+            ri = r[i]
+            for j in range(i + 1, n):
+                if ri < r[j]:
+                    v[i] += 1
+                    v[j] -= 1
+                elif ri > r[j]:
+                    v[i] -= 1
+                    v[j] += 1
+        for i in range(n):
+            r[i] += v[i]
+        time += 1
+        if r == init and not any(v):
+            return time
+
+
 def lcm(*values: list[int]) -> int:
     args = list(values)
     result = args.pop(0)
@@ -217,16 +333,39 @@ def sign(v: int) -> int:
         return -1
     return 0
 
-def parse_input(lines) -> list[Body]:
+def parse_input(lines, history_size: int = 0) -> list[Body]:
     result = []
     for line in lines:
         m = VECTOR_RE.match(line)
         if m:
             xyz = [int(v) for v in m.groups()]
-            result.append(Body(Vector(*xyz)))
+            result.append(Body(Vector(*xyz), history_size=history_size))
     return result
 
 
+def solve2_parallel(lines: Lines) -> int:
+    """Solve the problem by finding the period of each axis in its own
+    process.
+    """
+    states = [body.phase_state() for body in parse_input(lines)]
+    axes = [[state[axis] for state in states] for axis in range(3)]
+    with ProcessPoolExecutor(3) as pool:
+        periods = list(pool.map(axis_period, axes))
+    return lcm(*periods)
+
+
+def solve2_np(lines: Lines) -> int:
+    """Solve the problem with an ArraySystem."""
+    return ArraySystem.from_bodies(parse_input(lines)).find_cycle()
+
+
+def solve_np(lines: Lines, steps: int) -> int:
+    """Solve the problem with an ArraySystem."""
+    system = ArraySystem.from_bodies(parse_input(lines))
+    system.run(steps)
+    return system.total_energy()
+
+
 def solve2(lines: Lines) -> int:
     """Solve the problem."""
     bodies = parse_input(lines)
@@ -262,6 +401,7 @@ def example1() -> None:
     for text, steps, expected in SAMPLE_CASES:
         lines = sample_input(text)
         result = solve(lines, steps)
+        assert solve_np(lines, steps) == result
         print("\n".join(lines))
         print(f"'energy after {steps}' steps -> {result} (expected {expected})")
         assert result == expected
@@ -272,6 +412,7 @@ def part1(lines: Lines) -> None:
     result = solve(lines, 1000)
     print(f"result is {result}")
     assert result == 7988
+    assert solve_np(lines, 1000) == result
     print("= " * 32)
 
 
@@ -283,13 +424,27 @@ def example2() -> None:
     for text, expected in SAMPLE_CASES2:
         lines = sample_input(text)
         result = solve2(lines)
+        assert solve2_np(lines) == result
+        assert solve2_parallel(lines) == result
         print(f"result is {result} (expected {expected})")
+
+        # The history keeps only the last few states, oldest first
+        bodies = parse_input(lines, history_size=5)
+        system = OrbitalSystem(bodies)
+        states = [bodies[0].phase_state()]
+        for _ in range(12):
+            system.step()
+            states.append(bodies[0].phase_state())
+        assert len(bodies[0].history) == 5
+        assert bodies[0].history.to_array().tolist() == [list(v) for v in states[-5:]]
         assert result == expected
     print("= " * 32)
 
 def part2(lines: Lines) -> None:
     print("PART 2:")
     result = solve2(lines)
+    assert solve2_np(lines) == result
+    assert solve2_parallel(lines) == result
     print(f"result is {result}")
     print("= " * 32)
 
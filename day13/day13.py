@@ -5,11 +5,15 @@
 import pdb
 from typing import Sequence, Optional, Union, Any
 from pathlib import Path
-from dataclasses import dataclass
-from collections import defaultdict
+import tempfile
 import time
+import sys
+
+import numpy as np
 
 from intcode import IntCode
+from grid import Grid
+from recorder import Recorder, Replay
 
 INPUTFILE = "input.txt"
 
@@ -25,17 +29,32 @@ def filter_blank_lines(lines: Lines) -> Lines:
 
 # Solution
 
-@dataclass(frozen=True)
 class Delta:
     """A Delta instance represents the difference between two locations
     on a grid.  Internally, it's represented using (row, column) offsets.
+    Instances are slotted and hashed as a packed integer, since they're
+    created on every ball move; treat them as immutable.
     """
-    dr: int
-    dc: int
+    __slots__ = ("dr", "dc")
+
+    def __init__(self, dr: int, dc: int):
+        self.dr = dr
+        self.dc = dc
+
+    def __repr__(self) -> str:
+        return f"Delta(dr={self.dr}, dc={self.dc})"
 
     def __str__(self) -> str:
         return f"delta({self.dr}, {self.dc})"
 
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not Delta:
+            return NotImplemented
+        return self.dr == other.dr and self.dc == other.dc
+
+    def __hash__(self) -> int:
+        return (self.dr << 32) ^ self.dc
+
     def __add__(self, other: "Delta") -> "Delta":
         return Delta(self.dr + other.dr, self.dc + other.dc)
 
@@ -43,17 +62,31 @@ class Delta:
         return Delta(self.dr - other.dr, self.dc - other.dc)
 
 
-@dataclass(frozen=True)
 class Location:
     """A Location instance represents a location on a grid.
-    Internally, it's represented using (row, column) coordinates
+    Internally, it's represented using (row, column) coordinates.
+    Like Delta, it's slotted; treat instances as immutable.
     """
-    r: int
-    c: int
+    __slots__ = ("r", "c")
+
+    def __init__(self, r: int, c: int):
+        self.r = r
+        self.c = c
+
+    def __repr__(self) -> str:
+        return f"Location(r={self.r}, c={self.c})"
 
     def __str__(self) -> str:
         return f"({self.r}, {self.c})"
 
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not Location:
+            return NotImplemented
+        return self.r == other.r and self.c == other.c
+
+    def __hash__(self) -> int:
+        return (self.r << 32) ^ self.c
+
     def right(self) -> "Location":
         return Location(self.r, self.c + 1)
 
@@ -87,6 +120,9 @@ TILE = {
     BALL: "o",
 }
 
+# Display characters, indexed by tile value
+CHARS = np.array([TILE[v] for v in range(len(TILE))])
+
 SCORE_UPDATE = Location(0, -1)
 
 RIGHT = 1
@@ -96,169 +132,241 @@ LEFT = -1
 
 class Screen:
     def __init__(self):
-        self.tiles: dict[Location, int] = defaultdict(int)
+        self.tiles: Grid = Grid(EMPTY)
+        self.dirty: set[Location] = set()
+        self.redraw: bool = True
         self.tile(Location(0, 0), EMPTY)
 
     def tile(
         self, loc: Location, new_tile: Optional[int] = None
     ) -> int:
-        """Get (or set) the tile at the specified location."""
+        """Get (or set) the tile at the specified location.  Setting a tile
+        marks its cell dirty if it changed, or schedules a full redraw if
+        the bounds grew.
+        """
         try:
             assert loc.r is not None and loc.c is not None
             if new_tile is not None:
                 assert new_tile in TILE
-                self.tiles[loc] = new_tile
-            return self.tiles[loc]
+                old_tile = self.tiles.get(loc.r, loc.c)
+                old_bounds = self.tiles.bounds()
+                self.tiles.set(loc.r, loc.c, new_tile)
+                if self.tiles.bounds() != old_bounds:
+                    self.redraw = True
+                elif new_tile != old_tile:
+                    self.dirty.add(loc)
+                return new_tile
+            return self.tiles.get(loc.r, loc.c)
         except Exception as exc:
             print(exc)
             pdb.set_trace()
 
     def bounds(self) -> tuple[int, int, int, int]:
-        if not self.tiles:
-            return 0, 0, 0, 0
-        rmin = min([loc.r for loc in self.tiles.keys()])
-        rmax = max([loc.r for loc in self.tiles.keys()])
-        cmin = min([loc.c for loc in self.tiles.keys()])
-        cmax = max([loc.c for loc in self.tiles.keys()])
-        return rmin, rmax, cmin, cmax
+        return self.tiles.bounds()
 
     def dimensions(self) -> tuple[int, int]:
         rmin, rmax, cmin, cmax = self.bounds()
         return rmax - rmin + 1, cmax - cmin + 1
 
     def __str__(self):
-        rmin, rmax, cmin, cmax = self.bounds()
-        rows = []
-        for r in range(rmin, rmax+1):
-            row = []
-            for c in range(cmin, cmax+1):
-                row.append(TILE[self.tiles[Location(r, c)]])
-            rows.append("".join(row))
-        return "\n".join(rows)
+        return "\n".join(["".join(row) for row in CHARS[self.tiles.view()]])
+
+    def refresh(self, top: int = 1) -> str:
+        """Return the ANSI escape sequence that brings a terminal showing
+        the previous frame (with its first row on terminal line top) up to
+        date.  Only the changed cells are emitted, unless the bounds have
+        grown since then, in which case the whole frame is redrawn.
+        """
+        if self.redraw:
+            self.redraw = False
+            self.dirty.clear()
+            return f"\x1b[{top};1H\x1b[J" + str(self)
+        rmin, _, cmin, _ = self.bounds()
+        result = []
+        for loc in self.dirty:
+            ch = TILE[self.tiles.get(loc.r, loc.c)]
+            result.append(f"\x1b[{top + loc.r - rmin};{1 + loc.c - cmin}H{ch}")
+        self.dirty.clear()
+        return "".join(result)
 
     def count_blocks(self) -> int:
-        return len([v for v in self.tiles.values() if v == BLOCK])
+        return self.tiles.count(BLOCK)
+
 
 
 class Arcade:
 
-    def __init__(self, proc: IntCode):
+    def __init__(self, proc: IntCode, recorder: Optional[Recorder] = None):
         self.screen: Screen = Screen()
         self.proc: IntCode = proc
+        self.recorder: Optional[Recorder] = recorder
         self.score: int = 0
         self.joystick: int = CENTER
         self._ball: Optional[Location] = None
-        self._dball: Optional[Location] = None
-        self._next_ball: Optional[Location] = None
+        self._dball: Optional[Delta] = None
         self.paddle: Optional[Location] = None
-        self._next_paddle: Optional[Location] = None
 
     def run(self) -> bool:
+        moves = [self.joystick]
         self.proc.input(self.joystick)
         done = self.proc.run()
         while True:
-            # consume all output from last run
-            tile: Optional[int] = 0
-            while tile is not None:
-                x = self.proc.output()
-                y = self.proc.output()
-                loc = Location(y, x)
-                tile = self.proc.output()
-                if loc == SCORE_UPDATE:
-                    self.score = tile
-                elif tile is not None:
-                    self.screen.tile(loc, tile)
-                    if tile == BALL:
-                        # print(f"ball -> {str(loc)}")
-                        self.ball(loc)
-                    elif tile == PADDLE:
-                        # print(f"paddle -> {str(loc)}")
-                        self.paddle = loc
+            if self.recorder:
+                self.recorder.record(moves, self.proc.out)
+            self.consume_output()
             if done:
                 break
 
-            self.update_joystick()
-            # Display the arcade screen
-            print(f"SCORE: {self.score}")
-            # print(f"ball:   {str(self._ball)} -> {str(self._next_ball)}")
-            # print(f"paddle: {str(self.paddle)} -> {str(self._next_paddle)}")
-            print(str(self.screen))
+            # Queue up all the joystick moves until the ball's next bounce
+            # off the paddle, and let the game run through them in one go.
+            moves = self.plan_moves()
+            self.display()
             time.sleep(0.1)
-            self.proc.input(self.joystick)
+            for move in moves:
+                self.proc.input(move)
+            self.joystick = moves[-1]
             done = self.proc.run()
         return done
 
+    def run_paddle_wall(self) -> bool:
+        """Play the game with the paddle stretched across the whole paddle
+        row, so the ball can never get past it.  After the initial screen
+        is drawn, the paddle row is found in the processor's copy of the
+        screen and overwritten with paddle tiles.  The rest of the game
+        then runs in a single run() call, with the joystick held in the
+        center, and only the final score is read from the output.
+        """
+        done = self.proc.run()
+        self.consume_output()
+        if done:
+            return done
+        self.patch_paddle_row()
+        self.proc.idle_input = CENTER
+        done = self.proc.run()
+
+        out = self.proc.out
+        for i in range(0, len(out) - 2, 3):
+            if out[i] == SCORE_UPDATE.c and out[i + 1] == SCORE_UPDATE.r:
+                self.score = out[i + 2]
+        self.proc.out = []
+        return done
+
+    def patch_paddle_row(self) -> None:
+        """Find the paddle row of the screen in the processor's memory,
+        and replace every non-wall tile in it with a paddle.
+        """
+        _, _, cmin, cmax = self.screen.bounds()
+        row = [self.screen.tile(Location(self.paddle.r, c)) for c in range(cmin, cmax+1)]
+        mem = [self.proc.mem[i] for i in range(max(self.proc.mem.keys()) + 1)]
+        matches = [
+            i for i in range(len(mem) - len(row) + 1)
+            if mem[i] == row[0] and mem[i:i + len(row)] == row
+        ]
+        if len(matches) != 1:
+            raise RuntimeError(f"found {len(matches)} copies of the paddle row in memory")
+        for i, tile in enumerate(row, start=matches[0]):
+            if tile != WALL:
+                self.proc.mem[i] = PADDLE
+
+    def consume_output(self) -> None:
+        """Consume all output from the last run, updating the screen,
+        the score and the locations of the ball and paddle.
+        """
+        tile: Optional[int] = 0
+        while tile is not None:
+            x = self.proc.output()
+            y = self.proc.output()
+            loc = Location(y, x)
+            tile = self.proc.output()
+            if loc == SCORE_UPDATE:
+                self.score = tile
+            elif tile is not None:
+                self.screen.tile(loc, tile)
+                if tile == BALL:
+                    # print(f"ball -> {str(loc)}")
+                    self.ball(loc)
+                elif tile == PADDLE:
+                    # print(f"paddle -> {str(loc)}")
+                    self.paddle = loc
+
+    def display(self) -> None:
+        """Update the arcade display on the terminal.  Only the cells that
+        changed since the last frame are redrawn.
+        """
+        nrows, _ = self.screen.dimensions()
+        sys.stdout.write(
+            f"\x1b[1;1HSCORE: {self.score}\x1b[K"
+            + self.screen.refresh(top=2)
+            + f"\x1b[{nrows + 2};1H"
+        )
+        sys.stdout.flush()
+
     def ball(self, new_loc: Optional[Location] = None) -> Optional[Location]:
         if new_loc:
             if self._ball:
-                # if self._next_ball:
-                #     print(f"ball: {str(self._ball)} -> {str(new_loc)} ({str(self._next_ball)})")
-                #     assert new_loc == self._next_ball
                 self._dball =  new_loc - self._ball
                 # print(f"ball direction is {str(self._dball)}")
             self._ball = new_loc
         return self._ball
 
-    def update_joystick(self) -> None:
-        if not self.paddle or not self._ball or not self._dball:
-            self.joystick = CENTER
-            self._next_ball = None
-            return
-
+    def predict_landing(self) -> tuple[Location, int]:
+        """Project the ball's path from its current location and direction
+        down to the row just above the paddle.  Walls and blocks deflect
+        the ball the same way the game does (a block is removed when it is
+        hit), and the whole paddle row is treated as solid, since that's
+        where the paddle will be waiting.  Return the location where the
+        ball lands, and the number of frames until it gets there.
+        """
         ball, dloc = self._ball, self._dball
-        next_ball = ball + dloc
-        paddle = self.paddle
-        contact = next_ball.r == paddle.r
-
-        # Ball is about to bounce off a side wall
-        if self.screen.tile(ball.right()) in (BLOCK, WALL) and dloc.dc == 1:
-            dloc = Delta(dloc.dr, -1)
-        elif self.screen.tile(ball.left()) in (BLOCK, WALL) and dloc.dc == -1:
-            dloc = Delta(dloc.dr, 1)
-
-        # ball is about to hit a block or wall, above
-        if dloc.dr == -1:
-            if self.screen.tile(ball.up()) in (BLOCK, WALL):
-                dloc = Delta(1, dloc.dc)
-            elif self.screen.tile(ball + dloc) == BLOCK:
-                dloc = Delta(1, -dloc.dc)
-
-        # block is about to hit a block or paddle, below
-        else:
-            if self.screen.tile(ball.down()) == BLOCK:
-                dloc = Delta(-1, dloc.dc)
-            elif self.screen.tile(next_ball) == BLOCK:
-                dloc = Delta(-1, -dloc.dc)
-            
-        if contact:
-            if ball.c == paddle.c:
-                dloc = Delta(-1, dloc.dc)
-                self.joystick = CENTER
-            elif next_ball.c == paddle.c:
-                dloc = Delta(-1, -dloc.dc)
-                self.joystick = CENTER
-            elif next_ball.c < paddle.c:
-                dloc = Delta(-1, dloc.dc)
-                self.joystick = LEFT
-            elif next_ball.c > paddle.c:
-                dloc = Delta(-1, dloc.dc)
-                self.joystick = RIGHT
-        else:
-            if paddle.c < next_ball.c:
-                self.joystick = RIGHT
-            elif paddle.c > next_ball.c:
-                self.joystick = LEFT
-            else:
-                self.joystick = CENTER
-
-        # print(f"ball direction: {str(self._dball)} -> {str(dloc)}")
-
-        self._next_ball = ball + dloc
-        # print(f"ball prediction {str(self._next_ball)}")
-
-        self._next_paddle = self.paddle + Delta(0, self.joystick)
-        # print(f"joystick: {self.joystick}")
-
+        paddle_row = self.paddle.r
+        broken: set[Location] = set()
+        nrows, ncols = self.screen.dimensions()
+        max_frames = 4 * nrows * ncols
+
+        def solid(loc: Location) -> bool:
+            if loc.r >= paddle_row:
+                return True
+            tile = self.screen.tile(loc)
+            return tile == WALL or (tile == BLOCK and loc not in broken)
+
+        frames = 0
+        while not (ball.r == paddle_row - 1 and dloc.dr == 1):
+            # Like the game, keep deflecting until the ball has a clear move
+            for _ in range(4):
+                dr, dc = dloc.dr, dloc.dc
+                side, vert = Location(ball.r, ball.c + dc), Location(ball.r + dr, ball.c)
+                hit = False
+                if solid(side):
+                    broken.add(side)
+                    dc, hit = -dc, True
+                if solid(vert):
+                    broken.add(vert)
+                    dr, hit = -dr, True
+                if not hit and solid(ball + dloc):
+                    broken.add(ball + dloc)
+                    dr, dc, hit = -dr, -dc, True
+                dloc = Delta(dr, dc)
+                if not hit:
+                    break
+            ball = ball + dloc
+            frames += 1
+            if frames > max_frames:
+                raise RuntimeError(f"ball never lands, from {str(self._ball)}")
+        return ball, frames
+
+    def plan_moves(self) -> list[int]:
+        """Return the joystick moves for every frame up to and including
+        the ball's next bounce off the paddle.  The paddle moves before
+        the ball does, so it must be under the landing location by the
+        frame after the ball gets there.  If it can't get there in time,
+        it gets as close as it can; no moves are queued past the bounce.
+        """
+        if not self.paddle or not self._ball or not self._dball:
+            return [CENTER]
+        landing, frames = self.predict_landing()
+        offset = landing.c - self.paddle.c
+        moves = [RIGHT if offset > 0 else LEFT] * min(abs(offset), frames + 1)
+        return moves + [CENTER] * (frames + 1 - len(moves))
 
     def count_blocks(self) -> int:
         return self.screen.count_blocks()
@@ -304,12 +412,36 @@ def test_arcade() -> None:
     print(str(arcade.screen))
     return arcade.count_blocks()
 
-def solve2(lines: Lines) -> int:
-    """Solve the problem."""
+def solve2(lines: Lines, recording: Optional[str] = None) -> int:
+    """Solve the problem.  The session is recorded, if a recording file
+    is specified.  Each recorded step covers one batch of joystick moves,
+    up to the ball's next bounce off the paddle, not a single frame.
+    """
+    proc = IntCode(lines[0])
+    proc.mem[0] = 2
+    if recording:
+        with Recorder(recording) as recorder:
+            arcade = Arcade(proc, recorder)
+            arcade.run()
+    else:
+        arcade = Arcade(proc)
+        arcade.run()
+    return arcade.score
+
+def replay2(lines: Lines, recording: str) -> int:
+    """Replay a recorded session, and return the final score."""
+    proc = IntCode(lines[0])
+    proc.mem[0] = 2
+    replay = Replay(Arcade(proc), recording)
+    replay.run()
+    return replay.arcade.score
+
+def solve2_paddle_wall(lines: Lines) -> int:
+    """Solve the problem, by patching the game's memory."""
     proc = IntCode(lines[0])
     proc.mem[0] = 2
     arcade = Arcade(proc)
-    arcade.run()
+    arcade.run_paddle_wall()
     return arcade.score
 
 def solve(lines: Lines) -> int:
@@ -342,8 +474,26 @@ def part1(lines: Lines) -> None:
 
 def part2(lines: Lines) -> None:
     print("PART 2:")
-    result = solve2(lines)
-    print(f"result is {result}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        recording = str(Path(tmpdir) / "session.rec")
+        result = solve2(lines, recording)
+        print(f"result is {result}")
+        assert result == 16999
+        assert replay2(lines, recording) == 16999
+
+        # Seek back to before the last snapshots, then replay to the end
+        proc = IntCode(lines[0])
+        proc.mem[0] = 2
+        replay = Replay(Arcade(proc), recording, snapshot_every=10)
+        replay.run()
+        assert replay.arcade.score == 16999
+        last = replay.step
+        replay.seek(15)
+        assert replay.step == 15 and replay.arcade.score < 16999
+        replay.run()
+        assert replay.step == last and replay.arcade.score == 16999
+    result = solve2_paddle_wall(lines)
+    print(f"result (paddle wall) is {result}")
     assert result == 16999
     print("= " * 32)
 
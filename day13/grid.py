@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Dense 2D grid of small integer values, backed by a growable NumPy array
+"""
+from typing import Optional
+
+import numpy as np
+
+
+class Grid:
+    """A Grid instance stores one int8 value per cell of an unbounded
+    2D grid.  Cells are addressed by (row, column) coordinates, which may
+    be negative; origin holds the array indices of cell (0, 0).  The array
+    doubles in size along an axis whenever a cell outside it is set.
+    Unset cells hold the default value.
+    """
+
+    def __init__(self, default: int = 0, shape: tuple[int, int] = (16, 16)):
+        self.default = default
+        self.cells = np.full(shape, default, dtype=np.int8)
+        self.origin = (shape[0] // 2, shape[1] // 2)
+        self._bounds: Optional[tuple[int, int, int, int]] = None
+
+    def get(self, r: int, c: int) -> int:
+        """Return the value of the cell at (r, c)."""
+        i, j = r + self.origin[0], c + self.origin[1]
+        if 0 <= i < self.cells.shape[0] and 0 <= j < self.cells.shape[1]:
+            return int(self.cells[i, j])
+        return self.default
+
+    def set(self, r: int, c: int, value: int) -> None:
+        """Set the value of the cell at (r, c), growing the grid if needed."""
+        i, j = r + self.origin[0], c + self.origin[1]
+        if not (0 <= i < self.cells.shape[0] and 0 <= j < self.cells.shape[1]):
+            self.grow(r, c)
+            i, j = r + self.origin[0], c + self.origin[1]
+        self.cells[i, j] = value
+
+        if self._bounds is None:
+            self._bounds = (r, r, c, c)
+        else:
+            rmin, rmax, cmin, cmax = self._bounds
+            if not (rmin <= r <= rmax and cmin <= c <= cmax):
+                self._bounds = (min(rmin, r), max(rmax, r), min(cmin, c), max(cmax, c))
+
+    def grow(self, r: int, c: int) -> None:
+        """Reallocate the array so that it includes cell (r, c).  Each axis
+        that is too small is doubled (repeatedly, if necessary), with the
+        new space split evenly before and after the existing cells.
+        """
+        nrows, ncols = self.cells.shape
+        i0, j0 = self.origin
+        while not (0 <= r + i0 < nrows):
+            i0 += nrows // 2
+            nrows *= 2
+        while not (0 <= c + j0 < ncols):
+            j0 += ncols // 2
+            ncols *= 2
+        cells = np.full((nrows, ncols), self.default, dtype=np.int8)
+        di, dj = i0 - self.origin[0], j0 - self.origin[1]
+        old_rows, old_cols = self.cells.shape
+        cells[di:di + old_rows, dj:dj + old_cols] = self.cells
+        self.cells = cells
+        self.origin = (i0, j0)
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """Return (rmin, rmax, cmin, cmax) for the cells that have been set."""
+        if self._bounds is None:
+            return 0, 0, 0, 0
+        return self._bounds
+
+    def view(self) -> np.ndarray:
+        """Return a view of the array, cropped to the bounds."""
+        rmin, rmax, cmin, cmax = self.bounds()
+        i0, j0 = self.origin
+        return self.cells[rmin + i0:rmax + i0 + 1, cmin + j0:cmax + j0 + 1]
+
+    def count(self, value: int) -> int:
+        """Return the number of cells, within the bounds, holding value."""
+        return int(np.count_nonzero(self.view() == value))
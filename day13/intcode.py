@@ -23,6 +23,7 @@ class IntCode:
         self.loc = 0 # instruction pointer
         self.base = 0 # relative base
         self.done = False # True, once exit instruction is executed
+        self.idle_input = None # read when the input stream is empty, if set
 
         if isinstance(mem, list):
             for i, v in enumerate(mem):
@@ -44,7 +45,9 @@ class IntCode:
     def run(self) -> bool:
         """Continue execution of the intcode program from the current
         instruction pointer.  Execution will continue until an exit
-        instruction is found or we're blocked by input.
+        instruction is found or we're blocked by input.  If idle_input
+        is set, it is read whenever the input stream is empty, so we're
+        never blocked.
         """
         op, addr = parse_instruction(self.mem[self.loc])
         while True:
@@ -65,10 +68,14 @@ class IntCode:
                 self.store(va * vb, c, addr[2])
                 self.loc += 4
             elif op == "03":
-                if not self.inp:
+                if self.inp:
+                    value = self.inp.pop(0)
+                elif self.idle_input is not None:
+                    value = self.idle_input
+                else:
                     break
                 a = self.mem[self.loc + 1]
-                self.store(self.inp.pop(0), a, addr[0])
+                self.store(value, a, addr[0])
                 # print(f"self.mem[{a}] <-- input {self.mem[a]}")
                 self.loc += 2
             elif op == "04":
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Recording and replay of arcade sessions
+"""
+from typing import Iterator, Optional, Any
+from pathlib import Path
+from copy import deepcopy
+
+MAGIC = b"AOC13R\x01"
+
+Step = tuple[list[int], list[int]]
+
+
+def zigzag(value: int) -> int:
+    """Map a signed integer onto an unsigned one (0, -1, 1, -2, ...)."""
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+def unzigzag(value: int) -> int:
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+def put_varint(buf: bytearray, value: int) -> None:
+    """Append a signed integer to buf, as a zigzag LEB128 varint."""
+    value = zigzag(value)
+    while value >= 0x80:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+def get_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Decode the varint at data[pos].  Return its value and the position
+    of the next byte.
+    """
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return unzigzag(value), pos
+        shift += 7
+
+
+class Recorder:
+    """A Recorder writes an arcade session to a binary file, one step per
+    processor run() call.  Since the arcade queues up all the joystick
+    moves until the ball's next bounce off the paddle, a step spans many
+    frames, not just one.  Each step holds the joystick inputs fed to the
+    processor, and the (x, y, tile) output triples it produced.  The x and
+    y values are stored as deltas from the previous triple, so most
+    triples take three bytes.
+    """
+
+    def __init__(self, path: str):
+        self.fh = Path(path).open("wb")
+        self.fh.write(MAGIC)
+        self.x, self.y = 0, 0
+
+    def record(self, inputs: list[int], outputs: list[int]) -> None:
+        buf = bytearray()
+        put_varint(buf, len(inputs))
+        for value in inputs:
+            put_varint(buf, value)
+        put_varint(buf, len(outputs) // 3)
+        for i in range(0, len(outputs) - 2, 3):
+            x, y, tile = outputs[i:i + 3]
+            put_varint(buf, x - self.x)
+            put_varint(buf, y - self.y)
+            put_varint(buf, tile)
+            self.x, self.y = x, y
+        self.fh.write(buf)
+
+    def close(self) -> None:
+        self.fh.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def read_recording(path: str) -> Iterator[Step]:
+    """Generate the (inputs, outputs) steps stored in a recording."""
+    data = Path(path).read_bytes()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not an arcade recording")
+    pos = len(MAGIC)
+    x, y = 0, 0
+    while pos < len(data):
+        count, pos = get_varint(data, pos)
+        inputs = []
+        for _ in range(count):
+            value, pos = get_varint(data, pos)
+            inputs.append(value)
+        count, pos = get_varint(data, pos)
+        outputs = []
+        for _ in range(count):
+            dx, pos = get_varint(data, pos)
+            dy, pos = get_varint(data, pos)
+            tile, pos = get_varint(data, pos)
+            x, y = x + dx, y + dy
+            outputs += [x, y, tile]
+        yield inputs, outputs
+
+
+class Replay:
+    """A Replay drives an arcade from a recording, feeding the recorded
+    inputs to its processor with no controller logic.  The outputs are
+    checked against the recording, unless verify is False.  A snapshot of
+    the arcade (processor included) is kept every snapshot_every steps,
+    so seek() only has to replay the steps since the nearest snapshot.
+    """
+
+    def __init__(
+        self,
+        arcade: Any,
+        path: str,
+        snapshot_every: int = 100,
+        verify: bool = True,
+    ):
+        self.arcade = arcade
+        self.steps: list[Step] = list(read_recording(path))
+        self.snapshot_every = snapshot_every
+        self.verify = verify
+        self.step: int = 0
+        self.snapshots: dict[int, Any] = {0: deepcopy(arcade)}
+
+    def advance(self) -> bool:
+        """Replay the next step.  Return True if the processor is done."""
+        inputs, outputs = self.steps[self.step]
+        proc = self.arcade.proc
+        for value in inputs:
+            proc.input(value)
+        done = proc.run()
+        if self.verify and proc.out != outputs:
+            raise RuntimeError(f"replay diverged from recording at step {self.step}")
+        self.arcade.consume_output()
+        self.step += 1
+        if self.step % self.snapshot_every == 0 and self.step not in self.snapshots:
+            self.snapshots[self.step] = deepcopy(self.arcade)
+        return done
+
+    def run(self, until: Optional[int] = None) -> bool:
+        """Replay steps until the given step (or the end of the recording)
+        is reached.  Return True if the processor is done.
+        """
+        if until is None:
+            until = len(self.steps)
+        done = False
+        while self.step < until and not done:
+            done = self.advance()
+        return done
+
+    def seek(self, step: int) -> None:
+        """Restore the arcade to its state just before the given step.
+        Steps are whole run() calls, so the arcade can only be restored
+        to a paddle bounce, not to an arbitrary frame.
+        """
+        if not 0 <= step <= len(self.steps):
+            raise ValueError(f"step {step} is not in the recording")
+        start = max([v for v in self.snapshots if v <= step])
+        if not start <= self.step <= step:
+            self.arcade = deepcopy(self.snapshots[start])
+            self.step = start
+        self.run(until=step)
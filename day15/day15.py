@@ -32,15 +32,21 @@ def solve2(lines: Lines) -> int:
     """Solve the problem."""
     proc = IntCode(lines[0])
     droid = Droid(proc)
-    done = droid.run(complete_map=True)
+    droid.explore(complete_map=True)
+    return droid.oxygen_fill_time()
+
+def solve2_dfs(lines: Lines) -> int:
+    """Solve the problem, mapping the maze with a single processor."""
+    proc = IntCode(lines[0])
+    droid = Droid(proc)
+    droid.explore_dfs()
     return droid.oxygen_fill_time()
 
 def solve(lines: Lines) -> int:
     """Solve the problem."""
     proc = IntCode(lines[0])
     droid = Droid(proc)
-    done = droid.run()
-    return droid.shortest_path()
+    return droid.explore()
 
 
 # PART 1
@@ -59,6 +65,9 @@ def part2(lines: Lines) -> None:
     result = solve2(lines)
     print(f"result is {result}")
     assert result == 288
+    result = solve2_dfs(lines)
+    print(f"result (depth-first) is {result}")
+    assert result == 288
     print("= " * 32)
 
 
@@ -4,9 +4,11 @@
 #
 from typing import Sequence, Optional, Union, Any
 import time
+import sys
+from collections import deque
 
 from intcode import IntCode
-from location import Location, Delta
+from location import Location, Delta, UP, DOWN, LEFT, RIGHT
 from field import Field, UNKNOWN, EMPTY, WALL, OXYGEN
 
 
@@ -44,10 +46,10 @@ DIR = {
 }
 
 MOVE = {
-    NORTH: Delta(-1, 0),
-    EAST: Delta(0, 1),
-    SOUTH: Delta(1, 0),
-    WEST: Delta(0, -1),
+    NORTH: UP,
+    EAST: RIGHT,
+    SOUTH: DOWN,
+    WEST: LEFT,
 }
 
 BLOCKED = 0
@@ -101,11 +103,80 @@ class Droid:
                 done = self.step(move, complete_map)
             else:
                 done = True
-            print("----------------")
-            print(str(self.field))
+            self.display()
             # time.sleep(0.1)
         return done
 
+    def explore(self, complete_map: bool = False) -> Optional[int]:
+        """Map the maze by breadth-first search from our location.  Rather
+        than walking the droid around, the processor is forked at each
+        newly discovered open cell, and each fork is only ever moved one
+        step further.  Cells are reached in order of distance, so the
+        distance to the oxygen generator is known as soon as it is found.
+        Return that distance (None if it wasn't found).  If complete_map
+        is True, the search continues until the whole maze is mapped.
+        """
+        queue = deque([(self.loc, self.proc, 0)])
+        oxygen_dist = None
+        while queue:
+            loc, proc, dist = queue.popleft()
+            for move, delta in MOVE.items():
+                next_loc = loc + delta
+                if self.field.tile(next_loc) != UNKNOWN:
+                    continue
+                fork = proc.clone()
+                fork.input(move)
+                _ = fork.run()
+                response = fork.output()
+                if response == BLOCKED:
+                    self.field.tile(next_loc, WALL)
+                    continue
+                if response == EUREKA:
+                    self.field.tile(next_loc, OXYGEN)
+                    self.oxygen = next_loc
+                    oxygen_dist = dist + 1
+                    if not complete_map:
+                        return oxygen_dist
+                else:
+                    self.field.tile(next_loc, EMPTY)
+                queue.append((next_loc, fork, dist + 1))
+        return oxygen_dist
+
+    def explore_dfs(self) -> None:
+        """Map the whole maze by depth-first search, with a single
+        processor.  From each open cell, the droid tries every unknown
+        neighbor; after exploring beyond an open one, it backtracks by
+        making the reverse move.  Each passage between open cells is
+        traversed exactly twice, and no map is drawn along the way.
+        """
+        # stack holds the move that got us to each cell on the current path,
+        # plus an iterator over the moves still to try from that cell
+        stack = [(None, iter(MOVE))]
+        while stack:
+            came_by, moves = stack[-1]
+            for move in moves:
+                next_loc = self.loc + MOVE[move]
+                if self.field.tile(next_loc) != UNKNOWN:
+                    continue
+                self.step(move, complete_map=True)
+                if self.loc == next_loc:
+                    stack.append((move, iter(MOVE)))
+                    break
+            else:
+                stack.pop()
+                if came_by is not None:
+                    self.step(TURN_BACK[came_by], complete_map=True)
+        if self.oxygen is not None:
+            self.field.tile(self.oxygen, OXYGEN)
+
+    def display(self) -> None:
+        """Update the map on the terminal.  Only the cells that changed
+        since the last step are redrawn.
+        """
+        nrows, _ = self.field.dimensions()
+        sys.stdout.write(self.field.refresh() + f"\x1b[{nrows + 1};1H")
+        sys.stdout.flush()
+
     def next_move(self) -> int:
         """Choose next move, following keep-righthand-on-the-wall strategy.
         """
@@ -168,8 +239,7 @@ class Droid:
 
     def neighbors(self, loc: Location) -> list[Location]:
         result = []
-        for move, delta in MOVE.items():
-            next_loc = loc + delta
+        for next_loc in loc.neighbors():
             tile = self.field.tile(next_loc)
             if tile == EMPTY or tile == OXYGEN:
                 result.append(next_loc)
@@ -178,36 +248,10 @@ class Droid:
     def shortest_path(self) -> int:
         """Return length of shortest path from (0, 0) to the oxygen generator."""
         assert self.oxygen is not None
-
-        # queue contains (loc, prev_loc, distance) tuples
-        queue = [(Location(0, 0), None, 0)]
-        last_dist = 0
-        while queue:
-            loc, last_loc, dist = queue.pop(0)
-            assert dist >= last_dist
-            if loc == self.oxygen:
-                return dist
-
-            for next_loc in self.neighbors(loc):
-                if next_loc != last_loc:
-                    queue.append((next_loc, loc, dist+1))
-        return None
+        return self.field.distance(self.oxygen, [Location(0, 0)])
 
     def oxygen_fill_time(self) -> int:
         """Return number timeunits required to fill ship with oxygen."""
         assert self.oxygen is not None
-
-        # queue contains (loc, prev_loc, distance) tuples
-        queue = [(self.oxygen, None, 0)]
-        last_dist = 0
-        while queue:
-            loc, last_loc, dist = queue.pop(0)
-            assert dist >= last_dist
-
-            for next_loc in self.neighbors(loc):
-                if next_loc != last_loc:
-                    queue.append((next_loc, loc, dist+1))
-            last_dist = dist
-        return last_dist
-
-
+        _, dist = self.field.farthest([self.oxygen])
+        return dist
@@ -6,8 +6,11 @@ import pdb
 from typing import Sequence, Optional, Union, Any
 from pathlib import Path
 from dataclasses import dataclass
-from collections import defaultdict, ChainMap
+
+import numpy as np
+
 from location import Location, Delta
+from grid import Grid, bfs_distances
 
 
 UNKNOWN = 0
@@ -24,47 +27,125 @@ TILE = {
     OXYGEN: "x",
 }
 
+# Display characters, indexed by tile value
+CHARS = np.array([TILE[v] for v in range(len(TILE))])
+
+
 class Field:
     def __init__(self):
-        self.tiles: dict[Location, int] = defaultdict(int)
+        self.tiles: Grid = Grid(UNKNOWN)
+        self.dirty: set[Location] = set()
+        self.redraw: bool = True
+        self._droid = Location(0, 0)
+        self._distance_fields: dict[frozenset[Location], np.ndarray] = {}
         self.tile(Location(0, 0), EMPTY)
-        self.droid = Location(0, 0)
+
+    @property
+    def droid(self) -> Location:
+        return self._droid
+
+    @droid.setter
+    def droid(self, loc: Location) -> None:
+        self.dirty.add(self._droid)
+        self.dirty.add(loc)
+        self._droid = loc
 
     def tile(
         self, loc: Location, new_tile: Optional[int] = None
     ) -> int:
-        """Get (or set) the tile at the specified location."""
+        """Get (or set) the tile at the specified location.  Setting a tile
+        marks its cell dirty if it changed, or schedules a full redraw if
+        the bounds grew.
+        """
         try:
             assert loc.r is not None and loc.c is not None
             if new_tile is not None:
                 assert new_tile in TILE
-                self.tiles[loc] = new_tile
-            return self.tiles[loc]
+                old_tile = self.tiles.get(loc.r, loc.c)
+                old_bounds = self.tiles.bounds()
+                self.tiles.set(loc.r, loc.c, new_tile)
+                if self.tiles.bounds() != old_bounds:
+                    self.redraw = True
+                    self._distance_fields.clear()
+                elif new_tile != old_tile:
+                    self.dirty.add(loc)
+                    self._distance_fields.clear()
+                return new_tile
+            return self.tiles.get(loc.r, loc.c)
         except Exception as exc:
             print(exc)
             pdb.set_trace()
 
     def bounds(self) -> tuple[int, int, int, int]:
-        if not self.tiles:
-            return 0, 0, 0, 0
-        rmin = min([loc.r for loc in self.tiles.keys()])
-        rmax = max([loc.r for loc in self.tiles.keys()])
-        cmin = min([loc.c for loc in self.tiles.keys()])
-        cmax = max([loc.c for loc in self.tiles.keys()])
-        return rmin, rmax, cmin, cmax
+        return self.tiles.bounds()
 
     def dimensions(self) -> tuple[int, int]:
         rmin, rmax, cmin, cmax = self.bounds()
         return rmax - rmin + 1, cmax - cmin + 1
 
-    def __str__(self):
+    def in_bounds(self, loc: Location) -> bool:
         rmin, rmax, cmin, cmax = self.bounds()
-        tiles = ChainMap({self.droid: DROID}, self.tiles)
-        rows = []
-        for r in range(rmin, rmax+1):
-            row = []
-            for c in range(cmin, cmax+1):
-                row.append(TILE[tiles[Location(r, c)]])
-            rows.append("".join(row))
-        return "\n".join(rows)
+        return rmin <= loc.r <= rmax and cmin <= loc.c <= cmax
+
+    def distance_field(self, sources: Sequence[Location]) -> np.ndarray:
+        """Return an array, covering the bounds of the field, holding the
+        distance of every cell from the nearest of the sources, moving
+        through open cells only (-1 where unreachable).  Sources outside
+        the bounds, or on cells that aren't open, are ignored.  The array
+        is computed once, and reused until the map changes.
+        """
+        key = frozenset([loc for loc in sources if self.in_bounds(loc)])
+        if key not in self._distance_fields:
+            rmin, _, cmin, _ = self.bounds()
+            view = self.tiles.view()
+            passable = (view == EMPTY) | (view == OXYGEN)
+            dist = bfs_distances(passable, [(loc.r - rmin, loc.c - cmin) for loc in key])
+            dist.flags.writeable = False
+            self._distance_fields[key] = dist
+        return self._distance_fields[key]
+
+    def distance(self, loc: Location, sources: Sequence[Location]) -> int:
+        """Return the distance of loc from the nearest of the sources."""
+        if not self.in_bounds(loc):
+            return -1
+        rmin, _, cmin, _ = self.bounds()
+        return int(self.distance_field(sources)[loc.r - rmin, loc.c - cmin])
+
+    def farthest(self, sources: Sequence[Location]) -> tuple[Location, int]:
+        """Return the reachable cell farthest from the sources, and its
+        distance from them.
+        """
+        dist = self.distance_field(sources)
+        i, j = np.unravel_index(np.argmax(dist), dist.shape)
+        rmin, _, cmin, _ = self.bounds()
+        return Location(int(i) + rmin, int(j) + cmin), int(dist[i, j])
+
+    def __str__(self):
+        rmin, _, cmin, _ = self.bounds()
+        rows = CHARS[self.tiles.view()]
+        if self.in_bounds(self.droid):
+            rows[self.droid.r - rmin, self.droid.c - cmin] = TILE[DROID]
+        return "\n".join(["".join(row) for row in rows])
 
+    def refresh(self, top: int = 1) -> str:
+        """Return the ANSI escape sequence that brings a terminal showing
+        the previous frame (with its first row on terminal line top) up to
+        date.  Only the changed cells are emitted, unless the bounds have
+        grown since then, in which case the whole frame is redrawn.
+        """
+        if self.redraw:
+            self.redraw = False
+            self.dirty.clear()
+            return f"\x1b[{top};1H\x1b[J" + str(self)
+        rmin, _, cmin, _ = self.bounds()
+        result = []
+        for loc in self.dirty:
+            if not self.in_bounds(loc):
+                continue
+            if loc == self.droid:
+                ch = TILE[DROID]
+            else:
+                ch = TILE[self.tiles.get(loc.r, loc.c)]
+            result.append(f"\x1b[{top + loc.r - rmin};{1 + loc.c - cmin}H{ch}")
+        self.dirty.clear()
+        return "".join(result)
@@ -41,6 +41,16 @@ class IntCode:
             return self.out.pop(0)
         return None
 
+    def clone(self) -> "IntCode":
+        """Return an independent copy of this processor, in its current
+        state, which can be run without affecting the original.
+        """
+        proc = copy(self)
+        proc.mem = copy(self.mem)
+        proc.inp = list(self.inp)
+        proc.out = list(self.out)
+        return proc
+
     def run(self) -> bool:
         """Continue execution of the intcode program from the current
         instruction pointer.  Execution will continue until an exit
@@ -1,21 +1,35 @@
 #!/usr/bin/env python3
 #
 from typing import Sequence, Optional, Union, Any
-from dataclasses import dataclass
-from collections import defaultdict
 
 
-@dataclass(frozen=True)
 class Location:
     """A Location instance represents a location on a grid.
-    Internally, it's represented using (row, column) coordinates
+    Internally, it's represented using (row, column) coordinates.
+    Instances are slotted and hashed as a packed integer, since grid
+    searches create and hash a great many of them; treat them as
+    immutable.
     """
-    r: int
-    c: int
+    __slots__ = ("r", "c")
+
+    def __init__(self, r: int, c: int):
+        self.r = r
+        self.c = c
+
+    def __repr__(self) -> str:
+        return f"Location(r={self.r}, c={self.c})"
 
     def __str__(self) -> str:
         return f"({self.r}, {self.c})"
 
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not Location:
+            return NotImplemented
+        return self.r == other.r and self.c == other.c
+
+    def __hash__(self) -> int:
+        return (self.r << 32) ^ self.c
+
     def right(self) -> "Location":
         return Location(self.r, self.c + 1)
 
@@ -28,26 +42,51 @@ class Location:
     def down(self) -> "Location":
         return Location(self.r + 1, self.c)
 
+    def neighbors(self) -> list["Location"]:
+        """Return the four locations adjacent to this one."""
+        r, c = self.r, self.c
+        return [Location(r + dr, c + dc) for dr, dc in NEIGHBOR_OFFSETS]
+
     def __add__(self, delta: "Delta") -> "Location":
         return Location(self.r + delta.dr, self.c + delta.dc)
 
     def __sub__(self, other: "Location") -> "Delta":
         return Delta(self.r - other.r, self.c - other.c)
 
-@dataclass(frozen=True)
+
 class Delta:
     """A Delta instance represents the difference between two locations
     on a grid.  Internally, it's represented using (row, column) offsets.
+    Like Location, it's slotted; treat instances as immutable.
     """
-    dr: int
-    dc: int
+    __slots__ = ("dr", "dc")
+
+    def __init__(self, dr: int, dc: int):
+        self.dr = dr
+        self.dc = dc
+
+    def __repr__(self) -> str:
+        return f"Delta(dr={self.dr}, dc={self.dc})"
 
     def __str__(self) -> str:
         return f"delta({self.dr}, {self.dc})"
 
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not Delta:
+            return NotImplemented
+        return self.dr == other.dr and self.dc == other.dc
+
+    def __hash__(self) -> int:
+        return (self.dr << 32) ^ self.dc
+
     def __add__(self, other: "Delta") -> "Delta":
         return Delta(self.dr + other.dr, self.dc + other.dc)
 
     def __sub__(self, other: "Delta") -> "Delta":
         return Delta(self.dr - other.dr, self.dc - other.dc)
 
+
+# (row, column) offsets of the four neighbors of a location: up, down, left, right
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+UP, DOWN, LEFT, RIGHT = [Delta(dr, dc) for dr, dc in NEIGHBOR_OFFSETS]
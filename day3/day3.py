@@ -2,6 +2,10 @@
 #
 #  Advent of Code 2019 - day 3
 #
+from typing import NamedTuple, Iterator, Optional
+from collections import defaultdict
+from bisect import bisect_left, insort
+from itertools import chain
 from pathlib import Path
 
 INPUTFILE = "input.txt"
@@ -39,6 +43,20 @@ SAMPLE_CASES2 = [
     ),
 ]
 
+# Wires, then the number of crossings, the nearest distance and the
+# smallest combined delay
+SAMPLE_CASES3 = [
+    (("R8,U5,L5,D3",
+      "U7,R6,D4,L4",
+      "L2,U3,R9,D10"),
+      10, 3, 10
+    ),
+    (("R10",
+      "U0,R10"),
+      10, 1, 2
+    ),
+]
+
 
 # Utility functions
 
@@ -63,52 +81,231 @@ Coords = tuple[int, int]
 def parse_path(line: str) -> Directions:
     return [(item[0], int(item[1:])) for item in line.split(",")]
 
-def trace_path(path: Directions) -> set[Coords]:
+class Segment(NamedTuple):
+    """A straight, horizontal or vertical, piece of a wire.  The fixed
+    coordinate is y for a horizontal segment, or x for a vertical one.
+    The other coordinate runs from lo to hi.  The wire enters the segment
+    at coordinate start, having taken steps steps to get there.  Segments
+    are tagged with the index of the wire they belong to.
+    """
+    fixed: int
+    lo: int
+    hi: int
+    start: int
+    steps: int
+    wire: int = 0
+
+    def steps_at(self, v: int) -> int:
+        """Return the wire's step count at coordinate v of the segment."""
+        return self.steps + abs(v - self.start)
+
+
+class Crossing(NamedTuple):
+    """A point where two different wires cross, with the step count of
+    each wire at that point.  wire1 is always less than wire2.
+    """
+    x: int
+    y: int
+    wire1: int
+    wire2: int
+    steps1: int
+    steps2: int
+
+    def distance(self) -> int:
+        """Return the Manhattan distance of the crossing from the origin."""
+        return abs(self.x) + abs(self.y)
+
+    def delay(self) -> int:
+        """Return the combined steps of both wires to the crossing."""
+        return self.steps1 + self.steps2
+
+
+def crossing(x: int, y: int, seg1: Segment, v1: int, seg2: Segment, v2: int) -> Crossing:
+    """Return the Crossing at (x, y), where segment seg1 is at coordinate
+    v1 and seg2 at coordinate v2.
+    """
+    if seg1.wire > seg2.wire:
+        seg1, v1, seg2, v2 = seg2, v2, seg1, v1
+    return Crossing(x, y, seg1.wire, seg2.wire, seg1.steps_at(v1), seg2.steps_at(v2))
+
+
+class Overlap(NamedTuple):
+    """A stretch of a line, from coordinate lo to hi, along which parallel
+    segments of two different wires run together.  Every point of it is a
+    crossing, but only a handful can be the nearest or the fastest.
+    """
+    seg1: Segment
+    seg2: Segment
+    lo: int
+    hi: int
+    is_vertical: bool
+
+    def crossing_at(self, v: int) -> Crossing:
+        """Return the crossing at coordinate v of the overlap."""
+        fixed = self.seg1.fixed
+        x, y = (fixed, v) if self.is_vertical else (v, fixed)
+        return crossing(x, y, self.seg1, v, self.seg2, v)
+
+    def crossings(self) -> Iterator[Crossing]:
+        """Generate the crossing at every point of the overlap, other than
+        the origin.
+        """
+        for v in range(self.lo, self.hi + 1):
+            cross = self.crossing_at(v)
+            if cross.x or cross.y:
+                yield cross
+
+    def candidates(self) -> Iterator[Crossing]:
+        """Generate the crossings that could be the nearest to the origin
+        or the one with the fewest steps.  Along the overlap, both are
+        piecewise linear, so they're at (or, if that's the origin, next
+        to) an end of the overlap or the origin's projection onto it.
+        """
+        lo, hi = self.lo, self.hi
+        for v in sorted({min(max(v, lo), hi) for v in (lo, lo + 1, hi - 1, hi, -1, 0, 1)}):
+            cross = self.crossing_at(v)
+            if cross.x or cross.y:
+                yield cross
+
+
+class CrossingReport(NamedTuple):
+    points: list[Crossing] # crossings of perpendicular segments
+    overlaps: list[Overlap] # overlaps of parallel segments
+    nearest: Optional[Crossing] # nearest to the origin
+    fastest: Optional[Crossing] # smallest combined delay
+
+    @property
+    def crossings(self) -> list[Crossing]:
+        """Return all the crossings, with the overlaps expanded point by
+        point.  A point where a pair of wires meets more than once (where
+        a wire loops back over it) is listed once, with the step count of
+        each wire's first visit.
+        """
+        found: dict[tuple[int, int, int, int], Crossing] = {}
+        for cross in chain(self.points, *[overlap.crossings() for overlap in self.overlaps]):
+            key = cross[:4]
+            if key in found:
+                prev = found[key]
+                cross = cross._replace(
+                    steps1=min(cross.steps1, prev.steps1),
+                    steps2=min(cross.steps2, prev.steps2),
+                )
+            found[key] = cross
+        return list(found.values())
+
+
+def trace_segments(path: Directions, wire: int = 0) -> tuple[list[Segment], list[Segment]]:
+    """Return the horizontal and vertical segments of the wire."""
     x, y = 0, 0
-    loc = dict()
     steps = 0
+    horizontal, vertical = [], []
     for direction, dist in path:
+        if dist == 0:
+            continue
         if direction == "U":
-            for _ in range(1, dist+1):
-                steps += 1
-                y += 1
-                if (x, y) not in loc:
-                    loc[(x, y)] = steps
+            vertical.append(Segment(x, y, y + dist, y, steps, wire))
+            y += dist
         elif direction == "D":
-            for _ in range(1, dist+1):
-                steps += 1
-                y -= 1
-                if (x, y) not in loc:
-                    loc[(x, y)] = steps
+            vertical.append(Segment(x, y - dist, y, y, steps, wire))
+            y -= dist
         elif direction == "R":
-            for _ in range(1, dist+1):
-                steps += 1
-                x += 1
-                if (x, y) not in loc:
-                    loc[(x, y)] = steps
+            horizontal.append(Segment(y, x, x + dist, x, steps, wire))
+            x += dist
         elif direction == "L":
-            for _ in range(1, dist+1):
-                steps += 1
-                x -= 1
-                if (x, y) not in loc:
-                    loc[(x, y)] = steps
-    return loc
+            horizontal.append(Segment(y, x - dist, x, x, steps, wire))
+            x -= dist
+        steps += dist
+    return horizontal, vertical
+
+
+def sweep_crossings(
+    horizontal: list[Segment], vertical: list[Segment]
+) -> Iterator[Crossing]:
+    """Generate the points where horizontal segments cross vertical
+    segments of a different wire, by sweeping a line across x.  The
+    horizontal segments spanning the line are kept sorted by y, so each
+    vertical segment finds those it crosses by binary search.
+    """
+    ADD, QUERY, REMOVE = 0, 1, 2
+    events = []
+    for idx, seg in enumerate(horizontal):
+        events.append((seg.lo, ADD, idx))
+        events.append((seg.hi, REMOVE, idx))
+    for idx, seg in enumerate(vertical):
+        events.append((seg.fixed, QUERY, idx))
+    events.sort()
+
+    active = [] # (y, idx) of horizontal segments spanning the sweep line
+    for x, kind, idx in events:
+        if kind == ADD:
+            insort(active, (horizontal[idx].fixed, idx))
+        elif kind == REMOVE:
+            del active[bisect_left(active, (horizontal[idx].fixed, idx))]
+        else:
+            vseg = vertical[idx]
+            i = bisect_left(active, (vseg.lo, -1))
+            while i < len(active) and active[i][0] <= vseg.hi:
+                y, hidx = active[i]
+                hseg = horizontal[hidx]
+                if hseg.wire != vseg.wire:
+                    yield crossing(x, y, hseg, x, vseg, y)
+                i += 1
+
+
+def find_overlaps(segments: list[Segment], is_vertical: bool) -> Iterator[Overlap]:
+    """Generate the overlaps of parallel segments of different wires.
+    Segments on the same line are sorted by lo, and each is compared only
+    with the earlier ones that still reach it.
+    """
+    by_line = defaultdict(list)
+    for seg in segments:
+        by_line[seg.fixed].append(seg)
+    for line in by_line.values():
+        active = []
+        for seg2 in sorted(line, key=lambda seg: seg.lo):
+            active = [seg for seg in active if seg.hi >= seg2.lo]
+            for seg1 in active:
+                if seg1.wire != seg2.wire:
+                    yield Overlap(seg1, seg2, seg2.lo, min(seg1.hi, seg2.hi), is_vertical)
+            active.append(seg2)
+
+
+def crossing_report(paths: list[Directions]) -> CrossingReport:
+    """Find the crossings (other than at the origin) between every pair of
+    different wires, and the one nearest the origin and the one with the
+    smallest combined delay.  The segments of all the wires share one
+    sweep, and each overlap contributes only a few candidates, so time
+    depends on the number of segments and crossings, not on the length
+    of the wires or the number of pairs.  Overlaps are only expanded
+    point by point if the report's crossings are read.
+    """
+    horizontal, vertical = [], []
+    for wire, path in enumerate(paths):
+        horiz, vert = trace_segments(path, wire)
+        horizontal += horiz
+        vertical += vert
+    points = [cross for cross in sweep_crossings(horizontal, vertical) if cross.x or cross.y]
+    overlaps = list(find_overlaps(horizontal, False)) + list(find_overlaps(vertical, True))
+
+    nearest, fastest = None, None
+    for cross in chain(points, *[overlap.candidates() for overlap in overlaps]):
+        if nearest is None or cross.distance() < nearest.distance():
+            nearest = cross
+        if fastest is None or cross.delay() < fastest.delay():
+            fastest = cross
+    return CrossingReport(points, overlaps, nearest, fastest)
 
 
 def solve2(lines):
     """Solve the problem."""
-    path1 = trace_path(parse_path(lines[0]))
-    path2 = trace_path(parse_path(lines[1]))
-    dist = min([path1[(x, y)] + path2[(x, y)] for x, y in set(path1.keys()) & set(path2.keys())])
-    return dist
+    report = crossing_report([parse_path(line) for line in lines])
+    return report.fastest.delay()
 
 
 def solve(lines):
     """Solve the problem."""
-    path1 = trace_path(parse_path(lines[0]))
-    path2 = trace_path(parse_path(lines[1]))
-    dist = min([abs(x) + abs(y) for x, y in set(path1.keys()) & set(path2.keys())])
-    return dist
+    report = crossing_report([parse_path(line) for line in lines])
+    return report.nearest.distance()
 
 
 # PART 1
@@ -152,9 +349,24 @@ def part2(lines):
     print("= " * 32)
 
 
+# ANY NUMBER OF WIRES
+
+def example3():
+    """Run examples with overlapping wires, or more than two wires."""
+    print("EXAMPLE 3:")
+    for arg, ncross, distance, delay in SAMPLE_CASES3:
+        report = crossing_report([parse_path(line) for line in arg])
+        result = (len(report.crossings), report.nearest.distance(), report.fastest.delay())
+        expected = (ncross, distance, delay)
+        print(f"'{arg}' -> {result} (expected {expected})")
+        assert result == expected
+    print("= " * 32)
+
+
 if __name__ == "__main__":
     example1()
     lines = load_input(INPUTFILE)
     part1(lines)
     example2()
     part2(lines)
+    example3()
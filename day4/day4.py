@@ -3,6 +3,9 @@
 #  Advent of Code 2019 - day 4
 #
 from pathlib import Path
+from functools import cache
+from itertools import groupby
+from typing import Iterator
 
 INPUTFILE = "input.txt"
 
@@ -59,26 +62,124 @@ def is_valid(password: int) -> bool:
     return double
 
 
+def closes_double(run: int, exact_double: bool) -> bool:
+    """Return True if a run of run equal digits satisfies the double
+    rule (exactly two digits, if exact_double, else at least two).
+    """
+    return run == 2 if exact_double else run >= 2
+
+
+@cache
+def count_completions(
+    remaining: int, prev: int, run: int, double: bool, exact_double: bool
+) -> int:
+    """Return the number of ways to append remaining digits, none less
+    than the previous digit prev, to a prefix that ends in a run of run
+    copies of prev, such that the result is valid.  double is True if
+    the prefix already has a qualifying double.
+    """
+    if remaining == 0:
+        return int(double or closes_double(run, exact_double))
+    # runs longer than 3 (or 2, if any run will do) are all alike
+    cap = 3 if exact_double else 2
+    total = count_completions(remaining - 1, prev, min(run + 1, cap), double, exact_double)
+    double = double or closes_double(run, exact_double)
+    for digit in range(prev + 1, 10):
+        total += count_completions(remaining - 1, digit, 1, double, exact_double)
+    return total
+
+
+def count_upto(n: int, exact_double: bool = False) -> int:
+    """Return the number of valid passwords from 1 to n, of any length.
+    Digits are chosen from the left; whenever a digit is below the digit
+    of n at that position, the remaining digits are free, and the ways to
+    complete the password are counted combinatorially.
+    """
+    if n <= 0:
+        return 0
+    bound = [int(v) for v in str(n)]
+    total = 0
+    # all the passwords with fewer digits than n
+    for length in range(1, len(bound)):
+        for digit in range(1, 10):
+            total += count_completions(length - 1, digit, 1, False, exact_double)
+
+    # passwords with as many digits as n, that match n up to some digit
+    # and are smaller there (or match n completely)
+    prev, run, double = 1, 0, False
+    for i, limit in enumerate(bound):
+        remaining = len(bound) - i - 1
+        for digit in range(prev, limit):
+            if digit == prev and run:
+                total += count_completions(remaining, digit, run + 1, double, exact_double)
+            else:
+                closed = double or (run > 0 and closes_double(run, exact_double))
+                total += count_completions(remaining, digit, 1, closed, exact_double)
+        if limit < prev:
+            return total
+        if limit == prev and run:
+            run += 1
+        else:
+            double = double or (run > 0 and closes_double(run, exact_double))
+            prev, run = limit, 1
+    return total + int(double or closes_double(run, exact_double))
+
+
+def count_valid(low: int, high: int, exact_double: bool = False) -> int:
+    """Return the number of valid passwords from low to high, inclusive."""
+    return count_upto(high, exact_double) - count_upto(low - 1, exact_double)
+
+
+def next_nondecreasing(n: int) -> int:
+    """Return the smallest number >= n whose digits never decrease.  The
+    digits after the first decrease are all raised to the digit before
+    it, e.g. 2200 -> 2222.
+    """
+    digits = str(n)
+    for i in range(1, len(digits)):
+        if digits[i] < digits[i-1]:
+            return int(digits[:i] + digits[i-1] * (len(digits) - i))
+    return n
+
+
+def has_double(n: int, exact_double: bool = False) -> bool:
+    """Return True if n has a run of equal digits that satisfies the
+    double rule.
+    """
+    runs = [len(list(group)) for _, group in groupby(str(n))]
+    return any([closes_double(run, exact_double) for run in runs])
+
+
+def valid_passwords(low: int, high: int, exact_double: bool = False) -> Iterator[int]:
+    """Generate the valid passwords from low to high, inclusive, in order.
+    Only numbers with non-decreasing digits are ever considered; after
+    each one, the search jumps straight to the next.
+    """
+    n = next_nondecreasing(max(low, 1))
+    while n <= high:
+        if has_double(n, exact_double):
+            yield n
+        n = next_nondecreasing(n + 1)
+
+
 def solve2(text):
     """Solve the problem."""
     low, high = [int(v) for v in text.split("-")]
     print(f"range: {low} - {high}")
-    count = 0
-    for password in range(low, high+1):
-        if is_valid2(password):
-            count += 1
-    return count
+    return count_valid(low, high, exact_double=True)
 
 
 def solve(text):
     """Solve the problem."""
     low, high = [int(v) for v in text.split("-")]
     print(f"range: {low} - {high}")
-    count = 0
-    for password in range(low, high+1):
-        if is_valid(password):
-            count += 1
-    return count
+    return count_valid(low, high)
+
+
+def solve_stream(text, exact_double=False):
+    """Solve the problem by generating the passwords, one at a time."""
+    low, high = [int(v) for v in text.split("-")]
+    return sum(1 for _ in valid_passwords(low, high, exact_double))
 
 
 # PART 1
@@ -97,6 +198,7 @@ def part1(line):
     print("PART 1:")
     result = solve(line)
     assert result == 1665
+    assert solve_stream(line) == result
     print(f"result is {result}")
     print("= " * 32)
 
@@ -116,6 +218,8 @@ def example2():
 def part2(line):
     print("PART 2:")
     result = solve2(line)
+    assert result == 1131
+    assert solve_stream(line, exact_double=True) == result
     print(f"result is {result}")
     print("= " * 32)
 
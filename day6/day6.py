@@ -4,6 +4,9 @@
 #
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from typing import Optional
 
 INPUTFILE = "input.txt"
 
@@ -77,6 +80,125 @@ def build_graph(satellites):
     return neighbors
 
 
+class OrbitIndex:
+    """An OrbitIndex holds the orbit tree of a map, for fast queries.
+    Bodies are numbered in the order they're reached from COM, which is
+    number 0.  The depth of every body (its number of direct and indirect
+    orbits) is found in one pass, and up[k][i] holds the body 2**k steps
+    toward COM from body i, so the lowest common ancestor of two bodies
+    can be found in O(log n) steps.
+    """
+
+    def __init__(self, satellites: dict[str, list[str]], root: str = "COM"):
+        self.names: list[str] = [root]
+        self.ids: dict[str, int] = {root: 0}
+        parent = [0]
+        self.depth: list[int] = [0]
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            for satellite in satellites.get(self.names[i], []):
+                self.ids[satellite] = len(self.names)
+                self.names.append(satellite)
+                parent.append(i)
+                self.depth.append(self.depth[i] + 1)
+                stack.append(self.ids[satellite])
+
+        self.up: list[list[int]] = [parent]
+        for _ in range(max(self.depth).bit_length() - 1):
+            prev = self.up[-1]
+            self.up.append([prev[p] for p in prev])
+
+    def total_orbits(self) -> int:
+        """Return the total number of direct and indirect orbits."""
+        return sum(self.depth)
+
+    def ancestor(self, i: int, steps: int) -> int:
+        """Return the id of the body steps orbits toward COM from body i."""
+        k = 0
+        while steps:
+            if steps & 1:
+                i = self.up[k][i]
+            steps >>= 1
+            k += 1
+        return i
+
+    def lca(self, a: str, b: str) -> str:
+        """Return the nearest body that both a and b orbit (directly or
+        indirectly), or that is a or b itself.
+        """
+        return self.names[self._lca(self.ids[a], self.ids[b])]
+
+    def _lca(self, i: int, j: int) -> int:
+        depth = self.depth
+        if depth[i] < depth[j]:
+            i, j = j, i
+        i = self.ancestor(i, depth[i] - depth[j])
+        if i == j:
+            return i
+        for k in range(len(self.up) - 1, -1, -1):
+            if self.up[k][i] != self.up[k][j]:
+                i, j = self.up[k][i], self.up[k][j]
+        return self.up[0][i]
+
+    def distance(self, a: str, b: str) -> int:
+        """Return the number of orbits between bodies a and b."""
+        i, j = self.ids[a], self.ids[b]
+        return self.depth[i] + self.depth[j] - 2 * self.depth[self._lca(i, j)]
+
+    def transfers(self, a: str, b: str) -> int:
+        """Return the number of orbital transfers needed to move from the
+        object a orbits to the object b orbits.
+        """
+        return self.distance(a, b) - 2
+
+    def distances(
+        self,
+        pairs: list[tuple[str, str]],
+        workers: Optional[int] = None,
+        parallel_threshold: int = 100_000,
+    ) -> list[int]:
+        """Return the number of orbits between each (a, b) pair, in order.
+        If workers is given, batches of at least parallel_threshold pairs
+        are split into chunks and answered by that many worker processes,
+        each of which receives a copy of the index once.
+        """
+        ids = self.ids
+        if workers is None or workers < 2 or len(pairs) < parallel_threshold:
+            return self._distances([ids[a] for a, _ in pairs], [ids[b] for _, b in pairs])
+
+        first = array("i", [ids[a] for a, _ in pairs])
+        second = array("i", [ids[b] for _, b in pairs])
+        size = -(-len(pairs) // (workers * 4))
+        chunks = [(first[i:i + size], second[i:i + size]) for i in range(0, len(pairs), size)]
+        result = []
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self,)) as pool:
+            for distances in pool.map(_worker_distances, chunks):
+                result += distances.tolist()
+        return result
+
+    def _distances(self, first: list[int], second: list[int]) -> list[int]:
+        depth, lca = self.depth, self._lca
+        return [depth[i] + depth[j] - 2 * depth[lca(i, j)] for i, j in zip(first, second)]
+
+
+# The OrbitIndex used by a worker process in OrbitIndex.distances()
+_worker_index: Optional[OrbitIndex] = None
+
+def _init_worker(index: OrbitIndex) -> None:
+    global _worker_index
+    _worker_index = index
+
+def _worker_distances(chunk: tuple[array, array]) -> array:
+    first, second = chunk
+    return array("i", _worker_index._distances(first.tolist(), second.tolist()))
+
+
+def solve2_index(lines):
+    """Solve the problem using an OrbitIndex."""
+    return OrbitIndex(parse_input(lines)).transfers("YOU", "SAN")
+
+
 def solve2(lines):
     """Solve the problem."""
     satellites = parse_input(lines)
@@ -109,6 +231,11 @@ def solve(lines):
             bodies.append((satellite, orbits + 1))
     return count
 
+
+def solve_index(lines):
+    """Solve the problem using an OrbitIndex."""
+    return OrbitIndex(parse_input(lines)).total_orbits()
+
 # PART 1
 
 def example1():
@@ -117,6 +244,7 @@ def example1():
     lines = filter_blank_lines(SAMPLE_INPUT.split("\n"))
     result = solve(lines)
     expected = 42
+    assert solve_index(lines) == expected
     print(f"'sample-input' -> {result} (expected {expected})")
     assert result == expected
     print("= " * 32)
@@ -127,6 +255,7 @@ def part1(lines):
     result = solve(lines)
     print(f"result is {result}")
     assert result == 268504
+    assert solve_index(lines) == result
     print("= " * 32)
 
 
@@ -138,6 +267,12 @@ def example2():
     lines = filter_blank_lines(SAMPLE_INPUT2.split("\n"))
     result = solve2(lines)
     expected = 4
+    assert solve2_index(lines) == expected
+    index = OrbitIndex(parse_input(lines))
+    pairs = [(a, b) for a in index.names for b in index.names]
+    assert index.distances(pairs, workers=2, parallel_threshold=1) == [
+        index.distance(a, b) for a, b in pairs
+    ]
     print(f"'sample-input' -> {result} (expected {expected})")
     assert result == expected
     print("= " * 32)
@@ -147,6 +282,12 @@ def part2(lines):
     print("PART 2:")
     result = solve2(lines)
     assert result == 409
+    assert solve2_index(lines) == result
+    index = OrbitIndex(parse_input(lines))
+    pairs = [(a, b) for a in index.names[::37] for b in index.names[::41]]
+    expected = [index.distance(a, b) for a, b in pairs]
+    assert index.distances(pairs) == expected
+    assert index.distances(pairs, workers=2, parallel_threshold=1) == expected
     print(f"result is {result}")
     print("= " * 32)
 
@@ -3,6 +3,9 @@
 #  Advent of Code 2019 - Day 8
 #
 from pathlib import Path
+from typing import IO, Optional, Union
+
+import numpy as np
 
 INPUTFILE = "input.txt"
 
@@ -48,6 +51,75 @@ def top_pixel(pixels: list[str]) -> str:
             return pixel
     return "2"
 
+def load_image(text: str, width: int, height: int) -> np.ndarray:
+    """Return the image as a (layers, height, width) array of digits."""
+    data = np.frombuffer(text.strip().encode(), dtype=np.uint8) - ord("0")
+    assert data.size % (width * height) == 0
+    return data.reshape(-1, height, width)
+
+def checksum(image: np.ndarray) -> int:
+    """Return the number of 1 digits times the number of 2 digits in the
+    layer with the fewest 0 digits.
+    """
+    layers = image.reshape(len(image), -1)
+    zeros = layers.shape[1] - np.count_nonzero(layers, axis=1)
+    target = layers[np.argmin(zeros)]
+    return int(np.count_nonzero(target == 1)) * int(np.count_nonzero(target == 2))
+
+def composite(image: np.ndarray) -> np.ndarray:
+    """Return the (height, width) array of the top non-transparent pixels,
+    which is 2 where every layer is transparent.
+    """
+    opaque = image != 2
+    top = np.argmax(opaque, axis=0)
+    pixels = np.take_along_axis(image, top[np.newaxis], axis=0)[0]
+    return np.where(opaque.any(axis=0), pixels, 2).astype(np.uint8)
+
+def pixels_text(pixels: np.ndarray) -> str:
+    """Return an array of pixels as a string of digits."""
+    return (pixels.ravel() + ord("0")).tobytes().decode()
+
+def decode_stream(
+    fh: IO, width: int, height: int, need_checksum: bool = True
+) -> tuple[Optional[int], np.ndarray]:
+    """Decode an image from a file handle (text or binary), one layer at a
+    time, so that only one layer is ever held in memory.  Return the
+    checksum and the (height, width) composite.  The checksum needs every
+    layer, so the read stops as soon as no transparent pixels remain only
+    if need_checksum is False, in which case the checksum is None.
+    """
+    size = width * height
+    pixels = np.full(size, 2, dtype=np.uint8)
+    transparent = np.ones(size, dtype=bool)
+    min_zeros, result = size + 1, None
+    while True:
+        chunk: Union[str, bytes] = fh.read(size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if len(chunk) < size:
+            if chunk.strip():
+                raise ValueError("image data is not a whole number of layers")
+            break
+        layer = np.frombuffer(chunk, dtype=np.uint8) - ord("0")
+        if need_checksum:
+            zeros = size - np.count_nonzero(layer)
+            if zeros < min_zeros:
+                min_zeros = zeros
+                result = int(np.count_nonzero(layer == 1)) * int(np.count_nonzero(layer == 2))
+        np.copyto(pixels, layer, where=transparent)
+        transparent &= layer == 2
+        if not need_checksum and not transparent.any():
+            break
+    return result, pixels.reshape(height, width)
+
+def solve2_np(text: str, width: int, height: int) -> str:
+    """Solve the problem with NumPy arrays."""
+    return pixels_text(composite(load_image(text, width, height)))
+
+def solve_np(text: str, width: int, height: int) -> int:
+    """Solve the problem with NumPy arrays."""
+    return checksum(load_image(text, width, height))
+
 def solve2(text: str, width: int, height: int) -> str:
     """Solve the problem."""
     layers = get_layers(text, width, height)
@@ -79,6 +151,7 @@ def example1():
     lines = filter_blank_lines(SAMPLE_INPUT.split("\n"))
     result = solve(lines[0], 3, 2)
     expected = 1
+    assert solve_np(lines[0], 3, 2) == expected
     print(f"'sample-input' -> {result} (expected {expected})")
     assert result == expected
     print("= " * 32)
@@ -89,6 +162,9 @@ def part1(lines):
     result = solve(lines[0], 25, 6)
     print(f"result is {result}")
     assert result == 1330
+    assert solve_np(lines[0], 25, 6) == result
+    with Path(INPUTFILE).open() as fh:
+        assert decode_stream(fh, 25, 6)[0] == result
     print("= " * 32)
 
 
@@ -100,6 +176,7 @@ def example2():
     lines = filter_blank_lines(SAMPLE_INPUT2.split("\n"))
     result = solve2(lines[0], 2, 2)
     expected = "0110"
+    assert solve2_np(lines[0], 2, 2) == expected
     print(f"'sample-input' -> {result} (expected {expected})")
     assert result == expected
     print("= " * 32)
@@ -108,6 +185,10 @@ def example2():
 def part2(lines):
     print("PART 1:")
     result = solve2(lines[0], 25, 6)
+    assert solve2_np(lines[0], 25, 6) == result
+    with Path(INPUTFILE).open("rb") as fh:
+        _, pixels = decode_stream(fh, 25, 6, need_checksum=False)
+        assert pixels_text(pixels) == result
     print(f"result is {result}")
     print("= " * 32)
 